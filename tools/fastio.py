@@ -0,0 +1,72 @@
+# tools/fastio.py
+"""
+rebuild.py / generate_notes.py 共用的小工具：整文件读写绕开缓冲 IO，日期快速解析。
+两个脚本都从 tools/ 目录运行，可以直接 import fastio。
+"""
+from __future__ import annotations
+
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+def fast_read_bytes(path: Path) -> bytes:
+    """整个文件一次性读入：os.read 直接读 st_size 字节，不经过 BufferedReader"""
+    # Windows 下 os.open 默认是文本模式（会改写 CRLF、遇到 0x1A 截断），必须显式二进制
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        while len(data) < size:  # 极少见的短读
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    return data
+
+
+def decode_text(data: bytes, errors: str = "strict") -> str:
+    """按 utf-8 解码，换行统一成 \\n，和 read_text 的通用换行行为一致"""
+    text = data.decode("utf-8", errors=errors)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def fast_read_text(path: Path, errors: str = "strict") -> str:
+    return decode_text(fast_read_bytes(path), errors=errors)
+
+
+def fast_write_text(path: Path, text: str) -> None:
+    """
+    先整体编码成 bytes，再用 os.write 一次写完，不经过 BufferedWriter。
+    换行按系统习惯转换，和 write_text 的行为一致。
+    """
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    data = text.encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        written = os.write(fd, data)
+        while written < len(data):  # 极少见的短写
+            written += os.write(fd, data[written:])
+    finally:
+        os.close(fd)
+
+
+def parse_ymd(s: str) -> datetime:
+    """
+    解析 YYYY-MM-DD：标准形状直接切片转 int，比 strptime 快得多；
+    其他写法（如 2020-1-5）仍交给 strptime，不合法时同样抛 ValueError
+    """
+    if (
+        len(s) == 10
+        and s[4] == "-"
+        and s[7] == "-"
+        and s.isascii()
+        and (s[:4] + s[5:7] + s[8:]).isdigit()
+    ):
+        return datetime(int(s[:4]), int(s[5:7]), int(s[8:]))
+    return datetime.strptime(s, "%Y-%m-%d")
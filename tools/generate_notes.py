@@ -15,11 +15,14 @@
 
 from __future__ import annotations
 
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from html import escape
-from datetime import datetime
+
+from fastio import fast_read_text, fast_write_text, parse_ymd
 
 # ========= 路径设置（关键修改点） =========
 
@@ -30,12 +33,59 @@ RAW_DIR = ROOT / "raw"
 NOTES_DIR = ROOT / "notes"
 INDEX_PATH = ROOT / "index.html"
 CSS_REL_IN_NOTE = "../style.css"
+WRITE_WORKERS = 8  # 并发写 notes/*.html 的线程数
 
 # ========================================
 
 INVALID_FILENAME_CHARS = r'<>:"/\\|?*\n\r\t'
 INVALID_RE = re.compile(rf"[{re.escape(INVALID_FILENAME_CHARS)}]")
 
+# 「最近更新」卡片：中间内容不允许跨过 </section>，避免长 index 上的回溯
+RECENT_CARD_RE = re.compile(
+    r'<section class="card">[^<]*(?:<(?!/section>)[^<]*)*?'
+    r"<h2>\s*最近更新\s*</h2>"
+    r"([^<]*(?:<(?!/section>)[^<]*)*)</section>"
+)
+RECENT_UL_RE = re.compile(r'(<ul class="list">\s*)((?:[^<]|<(?!/ul>))*?)(\s*</ul>)')
+HREF_RE = re.compile(r'href="([^"]+)"')
+RAW_NAME_RE = re.compile(r"\d{4}-\d{2}-\d{2}-")
+
+# 文章页骨架：正文段落夹在 NOTE_HEAD 和 NOTE_TAIL 之间
+NOTE_HEAD = """<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>{title}</title>
+  <link rel="stylesheet" href="{css}" />
+</head>
+<body>
+  <main class="page">
+
+    <header class="topbar">
+      <a href="../index.html">← 返回手稿集</a>
+    </header>
+
+    <article class="prose">
+      <h1>{title}</h1>
+      <p class="meta">{date}</p>
+
+"""
+
+NOTE_TAIL = """
+    </article>
+
+    <footer class="footer">
+      <p>© 绿色恐龙</p>
+    </footer>
+
+  </main>
+</body>
+</html>
+"""
+
+EMPTY_BODY_HTML = "      <p>（正文为空）</p>\n"
+
 
 @dataclass(frozen=True)
 class Note:
@@ -55,7 +105,7 @@ def sanitize_filename_component(s: str) -> str:
 
 
 def parse_txt(txt_path: Path) -> Note:
-    raw = txt_path.read_text(encoding="utf-8").strip("\ufeff")
+    raw = fast_read_text(txt_path).strip("\ufeff")
     lines = raw.splitlines()
 
     if len(lines) < 2:
@@ -65,7 +115,7 @@ def parse_txt(txt_path: Path) -> Note:
     date_str = lines[1].strip()
 
     try:
-        datetime.strptime(date_str, "%Y-%m-%d")
+        parse_ymd(date_str)
     except Exception:
         raise ValueError(f"日期格式错误，应为 YYYY-MM-DD：{date_str}")
 
@@ -85,88 +135,52 @@ def parse_txt(txt_path: Path) -> Note:
     )
 
 
-def render_note_html(note: Note) -> str:
-    paras = []
-    if note.body_paragraphs:
-        for p in note.body_paragraphs:
-            paras.append(
-                f"      <p>\n        {escape(p)}\n      </p>\n"
-            )
-    else:
-        paras.append("      <p>（正文为空）</p>\n")
-
-    return f"""<!doctype html>
-<html lang="zh-CN">
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>{escape(note.title)}</title>
-  <link rel="stylesheet" href="{CSS_REL_IN_NOTE}" />
-</head>
-<body>
-  <main class="page">
-
-    <header class="topbar">
-      <a href="../index.html">← 返回手稿集</a>
-    </header>
-
-    <article class="prose">
-      <h1>{escape(note.title)}</h1>
-      <p class="meta">{escape(note.date)}</p>
-
-{''.join(paras).rstrip()}
-    </article>
+def render_paragraph(p: str) -> str:
+    return f"      <p>\n        {escape(p)}\n      </p>\n"
 
-    <footer class="footer">
-      <p>© 绿色恐龙</p>
-    </footer>
 
-  </main>
-</body>
-</html>
-"""
+def render_note_html(note: Note) -> str:
+    paras = "".join(map(render_paragraph, note.body_paragraphs)) or EMPTY_BODY_HTML
+    head = NOTE_HEAD.format_map(
+        {
+            "title": escape(note.title),
+            "css": CSS_REL_IN_NOTE,
+            "date": escape(note.date),
+        }
+    )
+    return head + paras.rstrip() + NOTE_TAIL
 
 
-def extract_recent_updates_ul(index_html: str):
-    card = re.search(
-        r"<section class=\"card\">.*?<h2>\s*最近更新\s*</h2>(.*?)</section>",
-        index_html,
-        re.S,
-    )
+def extract_recent_updates_ul(index_html: str) -> tuple[str, str, str]:
+    card = RECENT_CARD_RE.search(index_html)
     if not card:
         raise RuntimeError("找不到「最近更新」区块")
 
-    card_block = card.group(0)
+    card_start, card_end = card.span()
 
-    ul = re.search(
-        r"(<ul class=\"list\">\s*)(.*?)(\s*</ul>)",
-        card_block,
-        re.S,
-    )
+    # 只在卡片范围内找 <ul>，直接用匹配位置切片
+    ul = RECENT_UL_RE.search(index_html, card_start, card_end)
     if not ul:
         raise RuntimeError("找不到 <ul class=\"list\">")
 
-    ul_open, ul_inner, ul_close = ul.groups()
+    ul_open_end = ul.end(1)
+    ul_close_start = ul.start(3)
 
-    start = index_html.find(card_block)
-    end = start + len(card_block)
+    before_ul = index_html[:ul_open_end]
+    ul_inner = index_html[ul_open_end:ul_close_start]
+    after_ul = index_html[ul_close_start:]
 
-    before = index_html[:start]
-    after = index_html[end:]
+    return before_ul, ul_inner, after_ul
 
-    ul_start = card_block.find(ul_open)
-    ul_end = ul_start + len(ul_open) + len(ul_inner) + len(ul_close)
 
-    before_ul = before + card_block[:ul_start] + ul_open
-    after_ul = ul_close + card_block[ul_end:] + after
+def collect_index_hrefs(index_html: str) -> set[str]:
+    """一次性取出 index.html 里所有 href，统一成 / 分隔，之后用集合 O(1) 查询"""
+    return {h.replace("\\", "/") for h in HREF_RE.findall(index_html)}
 
-    return before_ul, ul_inner, after_ul
 
-
-def index_has_href(index_html: str, href: str) -> bool:
+def index_has_href(index_hrefs: set[str], href: str) -> bool:
     h = href.replace("\\", "/")
-    alt = h.replace("./", ".\\").replace("/", "\\")
-    return h in index_html or alt in index_html
+    return h in index_hrefs or h.replace("./", "", 1) in index_hrefs
 
 
 def build_li(note: Note) -> str:
@@ -178,18 +192,53 @@ def build_li(note: Note) -> str:
     )
 
 
-def main():
+def is_up_to_date(entry: os.DirEntry[str]) -> bool:
+    """
+    只看 stat 判断能否跳过：txt 按 YYYY-MM-DD-标题.txt 命名、对应的 html 已存在
+    且比 txt 新，就不用再读文件解析。命名不符合约定时返回 False，走正常流程。
+    txt 的 mtime 取自 scandir 目录项自带（并缓存）的 stat，不再单独 stat 一次
+    """
+    stem = entry.name[: -len(".txt")]
+    if not RAW_NAME_RE.match(stem):
+        return False
+    try:
+        txt_mtime = entry.stat().st_mtime_ns
+    except OSError:
+        return False
+    for name in {stem, sanitize_filename_component(stem)}:
+        try:
+            if (NOTES_DIR / f"{name}.html").stat().st_mtime_ns > txt_mtime:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def list_txt_files() -> list[os.DirEntry[str]]:
+    # scandir 直接给出文件名和类型，比 glob 少一次逐个 stat；保留目录项以便复用它的 stat
+    with os.scandir(RAW_DIR) as it:
+        entries = [e for e in it if e.name.endswith(".txt") and e.is_file()]
+    return sorted(entries, key=lambda e: Path(e.path))
+
+
+def main() -> None:
     RAW_DIR.mkdir(exist_ok=True)
     NOTES_DIR.mkdir(exist_ok=True)
 
-    txt_files = sorted(RAW_DIR.glob("*.txt"))
+    txt_files = list_txt_files()
     if not txt_files:
         print("[info] raw/ 中没有 txt 文件")
         return
 
-    new_notes = []
+    # 第一轮（串行）：解析 + 渲染，决定哪些文章要写
+    jobs: list[tuple[Path, str, Note]] = []
+    planned: set[str] = set()
 
-    for txt in txt_files:
+    for entry in txt_files:
+        if is_up_to_date(entry):
+            continue
+
+        txt = Path(entry.path)
         try:
             note = parse_txt(txt)
         except Exception as e:
@@ -197,19 +246,44 @@ def main():
             continue
 
         out_path = NOTES_DIR / note.html_filename
-        if out_path.exists():
+        # 同名文章只写第一篇，和逐个写盘时的幂等行为一致
+        if note.html_filename in planned or out_path.exists():
             continue
 
-        out_path.write_text(render_note_html(note), encoding="utf-8")
-        new_notes.append(note)
-        print(f"[ok] 生成 notes/{note.html_filename}")
-
-    if not new_notes:
+        planned.add(note.html_filename)
+        jobs.append((out_path, render_note_html(note), note))
+
+    # 第二轮：各文件互不相关，多线程并发写盘；每个结果单独确认，按原顺序输出
+    new_notes: list[Note] = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as ex:
+        futures = [
+            (ex.submit(fast_write_text, out_path, html_text), out_path, note)
+            for out_path, html_text, note in jobs
+        ]
+        for future, out_path, note in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                # 写了一半的文件删掉，否则下次会被当成“已存在”而跳过
+                try:
+                    out_path.unlink()
+                except OSError:
+                    pass
+                print(f"[fail] notes/{note.html_filename} → {e}")
+                continue
+            new_notes.append(note)
+            print(f"[ok] 生成 notes/{note.html_filename}")
+
+    if new_notes:
+        print(f"[ok] 新生成 {len(new_notes)} 篇文章")
+        print("[next] 运行 python tools/rebuild.py 更新 index/all/archive")
+    elif not failed:
         print("[info] 没有新文章生成")
-        return
 
-    print(f"[ok] 新生成 {len(new_notes)} 篇文章")
-    print("[next] 运行 python tools/rebuild.py 更新 index/all/archive")
+    if failed:
+        raise SystemExit(f"[error] {failed} 篇文章写入失败")
 
 
 if __name__ == "__main__":
@@ -2,10 +2,20 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import heapq
+import json
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from operator import attrgetter
 from pathlib import Path
+from typing import Any
 from datetime import datetime
-from html import unescape
+from html import escape, unescape
+
+from fastio import decode_text, fast_read_bytes, fast_read_text, fast_write_text, parse_ymd
 
 ROOT = Path(__file__).resolve().parents[1]
 NOTES_DIR = ROOT / "notes"
@@ -14,14 +24,20 @@ INDEX_PATH = ROOT / "index.html"
 THEMES_PATH = ROOT / "themes.html"
 ALL_PATH = ROOT / "all.html"
 ARCHIVE_PATH = ROOT / "archive.html"
+CACHE_PATH = ROOT / ".rebuild_cache.json"  # parse_post 结果缓存，可随时删除
+CACHE_VERSION = 2  # 改了 parse_post 的解析规则或缓存字段时加 1
+CacheEntry = dict[str, Any]  # {"mtime_ns", "size", "hash", "title_html", "date", "tag"}
 
 RECENT_N = 8  # 首页“最近更新”显示条数
+PARSE_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # 并发解析 notes 的线程数
 
 # 你现在/未来允许的标签（可随时加）
 KNOWN_TAGS = ["随笔", "废话", "随画", "漫画", "段子", "英语"]
 
+# 标题和 meta 各用一个预编译模式：都以字面量开头，正则引擎可以直接跳到候选位置
 RE_H1 = re.compile(r"<h1[^>]*>(.*?)</h1>", re.I | re.S)
 RE_META = re.compile(r'<p[^>]*class="meta"[^>]*>(.*?)</p>', re.I | re.S)
+RE_TAG_STRIP = re.compile(r"<[^>]+>")
 RE_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})")
 RE_TAG = re.compile("(" + "|".join(map(re.escape, KNOWN_TAGS)) + ")")
 
@@ -29,6 +45,63 @@ AUTOGEN_START = "<!-- AUTOGEN_RECENT_START -->"
 AUTOGEN_END = "<!-- AUTOGEN_RECENT_END -->"
 
 
+# all.html / archive.html 共用的页面骨架
+PAGE_TMPL = """<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>{title}｜绿色恐龙的手稿集</title>
+  <link rel="stylesheet" href="./style.css" />
+</head>
+<body>
+  <main class="page">
+
+    <header class="topbar">
+      <a href="./index.html">← 返回首页</a>
+      <span style="opacity:.6">｜</span>
+      {topbar}
+    </header>
+
+    <section class="card">
+{intro}      <div class="quick">
+        {pills}
+      </div>
+    </section>
+
+{sections}
+
+    <footer class="footer">
+      <p>© <span id="year"></span> xugaochen</p>
+    </footer>
+
+  </main>
+
+  <script>
+    document.getElementById("year").textContent = new Date().getFullYear();
+  </script>
+</body>
+</html>
+"""
+
+# {sections} 处切开：头部 format_map 一次，尾部是纯常量，中间的分区由 render_page 逐段写入
+PAGE_HEAD_TMPL, PAGE_TAIL = PAGE_TMPL.split("{sections}")
+
+ALL_INTRO = """      <div class="card-head">
+        <h2>查看全部</h2>
+        <div class="card-actions">
+          <a class="smalllink" href="./archive.html">按年份 →</a>
+        </div>
+      </div>
+
+      <p class="desc">按标签分区展示；也可以用浏览器搜索（Ctrl+F）找标题。</p>
+
+"""
+
+ARCHIVE_INTRO = """      <h2>按年份</h2>
+"""
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Rebuild site pages or add a theme block.")
     parser.add_argument(
@@ -42,12 +115,13 @@ def parse_args() -> argparse.Namespace:
 def strip_html(s: str) -> str:
     """去掉 html 标签，保留纯文本"""
     s = unescape(s)
-    s = re.sub(r"<[^>]+>", "", s)
+    if "<" in s:  # 大多数标题 / meta 本来就没有标签，省掉一次正则
+        s = RE_TAG_STRIP.sub("", s)
     return s.strip()
 
 
 def safe_read_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore")
+    return fast_read_text(path, errors="ignore")
 
 
 def clean_theme_name(theme: str) -> str:
@@ -127,9 +201,9 @@ def add_theme(theme: str) -> None:
     index_html, index_added = patch_index_theme_block(index_html, theme)
 
     if nav_added or section_added:
-        THEMES_PATH.write_text(themes_html, encoding="utf-8")
+        fast_write_text(THEMES_PATH, themes_html)
     if index_added:
-        INDEX_PATH.write_text(index_html, encoding="utf-8")
+        fast_write_text(INDEX_PATH, index_html)
 
     print(f"[ok] theme ready: {theme}")
     print(f"     themes nav: {'added' if nav_added else 'already exists'}")
@@ -137,14 +211,28 @@ def add_theme(theme: str) -> None:
     print(f"     index block: {'added' if index_added else 'already exists'}")
 
 
-def parse_post(fp: Path) -> dict:
+@dataclass(slots=True)
+class Post:
+    file: str
+    href: str
+    title: str  # 已做 html 转义，可直接拼进页面
+    date: str
+    tag: str
+    dt: datetime
+
+
+BY_DT = attrgetter("dt")
+
+
+def parse_post(fp: Path, html: str | None = None) -> Post:
     """
-    解析 notes/*.html
+    解析 notes/*.html（html 已读好时直接传入，避免重复读文件）
     - title: <h1>...</h1>，没有则用文件名（去扩展名）
     - date: meta里YYYY-MM-DD，缺失则从文件名开头提取
     - tag: meta里出现的 KNOWN_TAGS 之一，缺失默认“随笔”
     """
-    html = safe_read_text(fp)
+    if html is None:
+        html = safe_read_text(fp)
 
     # title
     m = RE_H1.search(html)
@@ -165,195 +253,181 @@ def parse_post(fp: Path) -> dict:
     mt = RE_TAG.search(meta_text)
     tag = mt.group(1) if mt else "随笔"
 
-    dt = datetime.strptime(date, "%Y-%m-%d")
+    dt = parse_ymd(date)
 
-    return {
-        "file": fp.name,
-        "href": f'./notes/{fp.name}',
-        "title": title,
-        "date": date,
-        "tag": tag,
-        "dt": dt,
-    }
+    return Post(
+        file=fp.name,
+        href=f'./notes/{fp.name}',
+        title=escape(title, quote=False),
+        date=date,
+        tag=tag,
+        dt=dt,
+    )
 
 
-def li(post: dict) -> str:
-    # 统一输出：YYYY-MM-DD｜标题
-    return f'        <li><a href="{post["href"]}">{post["date"]}｜{post["title"]}</a><span class="tag">{post["tag"]}</span></li>'
+def file_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
 
 
-def build_all_html(posts: list[dict]) -> str:
-    # 按 tag 分组：先固定顺序，再补“其他标签”
-    preferred = ["随笔", "废话", "随画"]
-    groups: dict[str, list[dict]] = {t: [] for t in preferred}
-    others: dict[str, list[dict]] = {}
+def cache_fingerprint() -> dict[str, Any]:
+    # 解析结果依赖的规则；任何一项变了，旧缓存整体作废（比如 KNOWN_TAGS 新增了标签）
+    return {"version": CACHE_VERSION, "known_tags": KNOWN_TAGS}
 
-    for p in posts:
-        if p["tag"] in groups:
-            groups[p["tag"]].append(p)
-        else:
-            others.setdefault(p["tag"], []).append(p)
 
-    # 组内按日期倒序
-    for k in groups:
-        groups[k].sort(key=lambda x: x["dt"], reverse=True)
-    for k in others:
-        others[k].sort(key=lambda x: x["dt"], reverse=True)
-
-    pills = []
-    for t in preferred:
-        pills.append(f'<a class="pill" href="#{t}">{t}</a>')
-    for t in sorted(others.keys()):
-        pills.append(f'<a class="pill" href="#{t}">{t}</a>')
-    pills_html = "\n        ".join(pills)
-
-    sections = []
-    for t in preferred:
-        ul = "\n".join(li(p) for p in groups[t])
-        sections.append(f"""
-    <section class="card" id="{t}">
-      <h2>{t}</h2>
-      <ul class="list">
-{ul}
-      </ul>
-    </section>
-""".rstrip())
+def load_cache() -> dict[str, CacheEntry]:
+    """读取 parse_post 缓存；文件不存在、已损坏或解析规则变了时当作空缓存"""
+    try:
+        data = json.loads(safe_read_text(CACHE_PATH))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("parser") != cache_fingerprint():
+        return {}
+    notes = data.get("notes")
+    return notes if isinstance(notes, dict) else {}
 
-    for t in sorted(others.keys()):
-        ul = "\n".join(li(p) for p in others[t])
-        sections.append(f"""
-    <section class="card" id="{t}">
-      <h2>{t}</h2>
-      <ul class="list">
-{ul}
-      </ul>
-    </section>
-""".rstrip())
 
-    return f"""<!doctype html>
-<html lang="zh-CN">
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>查看全部｜绿色恐龙的手稿集</title>
-  <link rel="stylesheet" href="./style.css" />
-</head>
-<body>
-  <main class="page">
+def save_cache(cache: dict[str, CacheEntry]) -> None:
+    data = {"parser": cache_fingerprint(), "notes": cache}
+    fast_write_text(CACHE_PATH, json.dumps(data, ensure_ascii=False, indent=1))
 
-    <header class="topbar">
-      <a href="./index.html">← 返回首页</a>
-      <span style="opacity:.6">｜</span>
-      <a href="./archive.html">按年份</a>
-    </header>
 
-    <section class="card">
-      <div class="card-head">
-        <h2>查看全部</h2>
-        <div class="card-actions">
-          <a class="smalllink" href="./archive.html">按年份 →</a>
-        </div>
-      </div>
+def list_notes() -> list[os.DirEntry[str]]:
+    """列出 notes/*.html；用 scandir，名字和类型直接来自目录项，不用逐个 stat"""
+    with os.scandir(NOTES_DIR) as it:
+        return [e for e in it if e.name.endswith(".html") and e.is_file()]
 
-      <p class="desc">按标签分区展示；也可以用浏览器搜索（Ctrl+F）找标题。</p>
 
-      <div class="quick">
-        {pills_html}
-      </div>
-    </section>
+def parse_post_cached(item: os.DirEntry[str], cache: dict[str, CacheEntry]) -> tuple[Post, CacheEntry]:
+    """
+    带缓存的 parse_post：
+    - mtime_ns + size 都没变 → 直接用缓存，不读文件
+    - git 检出会重置 mtime：size 没变时再比对内容哈希，一致也用缓存
+    - 其他情况重新解析
+    每个文件最多读一次：算哈希和解析共用同一份 bytes
+    返回 (post, 新的缓存条目)；不改动传入的 cache，可在线程池里并发调用
+    """
+    fp = Path(item.path)
+    st = item.stat()
+    entry = cache.get(fp.name)
+    data: bytes | None = None
+    if isinstance(entry, dict) and entry.get("size") == st.st_size:
+        hit = entry.get("mtime_ns") == st.st_mtime_ns
+        if not hit:
+            data = fast_read_bytes(fp)
+            hit = entry.get("hash") == file_digest(data)
+        if hit:
+            try:
+                dt = parse_ymd(entry["date"])
+                post = Post(
+                    file=fp.name,
+                    href=f'./notes/{fp.name}',
+                    title=entry["title_html"],
+                    date=entry["date"],
+                    tag=entry["tag"],
+                    dt=dt,
+                )
+            except (KeyError, TypeError, ValueError):
+                pass  # 缓存条目不完整，当作未命中
+            else:
+                return post, {**entry, "mtime_ns": st.st_mtime_ns}
+
+    if data is None:
+        data = fast_read_bytes(fp)
+    post = parse_post(fp, decode_text(data, errors="ignore"))
+    entry = {
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "hash": file_digest(data),
+        "title_html": post.title,
+        "date": post.date,
+        "tag": post.tag,
+    }
+    return post, entry
 
-{chr(10).join(sections)}
 
-    <footer class="footer">
-      <p>© <span id="year"></span> xugaochen</p>
-    </footer>
+def li(post: Post) -> str:
+    # 统一输出：YYYY-MM-DD｜标题
+    return f'        <li><a href="{post.href}">{post.date}｜{post.title}</a><span class="tag">{post.tag}</span></li>'
 
-  </main>
 
-  <script>
-    document.getElementById("year").textContent = new Date().getFullYear();
-  </script>
-</body>
-</html>
-"""
+def render_page(fields: dict[str, str], sections: list[tuple[str, str, list[Post]]]) -> str:
+    """
+    按 PAGE_TMPL 输出整页：头尾各 format 一次，中间所有 section / li 片段
+    依次放进同一个列表，最后只 join 一次，不再逐层拼中间字符串
+    """
+    parts = [PAGE_HEAD_TMPL.format_map(fields)]
+    add = parts.append
+    for i, (anchor, heading, group) in enumerate(sections):
+        if i:
+            add("\n")
+        add(f'\n    <section class="card" id="{anchor}">\n      <h2>{heading}</h2>\n      <ul class="list">\n')
+        for j, p in enumerate(group):
+            if j:
+                add("\n")
+            add(li(p))
+        add("\n      </ul>\n    </section>")
+    add(PAGE_TAIL)
+    return "".join(parts)
+
+
+def build_all_html(posts: list[Post]) -> str:
+    # 按 tag 分组：先固定顺序，再补“其他标签”
+    preferred = ["随笔", "废话", "随画"]
+    others = sorted({p.tag for p in posts} - set(preferred))
 
+    # 所有分组先建好，追加时不用再 setdefault；dict 顺序即页面顺序
+    groups: dict[str, list[Post]] = {t: [] for t in preferred + others}
+    for p in posts:
+        groups[p.tag].append(p)
 
-def build_archive_html(posts: list[dict]) -> str:
-    years: dict[int, list[dict]] = {}
+    # 组内按日期倒序
+    for group in groups.values():
+        group.sort(key=BY_DT, reverse=True)
+
+    return render_page(
+        {
+            "title": "查看全部",
+            "topbar": '<a href="./archive.html">按年份</a>',
+            "intro": ALL_INTRO,
+            "pills": "\n        ".join(f'<a class="pill" href="#{t}">{t}</a>' for t in groups),
+        },
+        [(t, t, group) for t, group in groups.items()],
+    )
+
+
+def build_archive_html(posts: list[Post]) -> str:
+    years: dict[int, list[Post]] = {}
     for p in posts:
-        years.setdefault(p["dt"].year, []).append(p)
+        years.setdefault(p.dt.year, []).append(p)
 
     # 年份倒序、组内倒序
     year_list = sorted(years.keys(), reverse=True)
     for y in year_list:
-        years[y].sort(key=lambda x: x["dt"], reverse=True)
-
-    pills_html = "\n        ".join([f'<a class="pill" href="#y{y}">{y}</a>' for y in year_list])
-
-    sections = []
-    for y in year_list:
-        ul = "\n".join(li(p) for p in years[y])
-        sections.append(f"""
-    <section class="card" id="y{y}">
-      <h2>{y}</h2>
-      <ul class="list">
-{ul}
-      </ul>
-    </section>
-""".rstrip())
-
-    return f"""<!doctype html>
-<html lang="zh-CN">
-<head>
-  <meta charset="utf-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1" />
-  <title>按年份｜绿色恐龙的手稿集</title>
-  <link rel="stylesheet" href="./style.css" />
-</head>
-<body>
-  <main class="page">
-
-    <header class="topbar">
-      <a href="./index.html">← 返回首页</a>
-      <span style="opacity:.6">｜</span>
-      <a href="./all.html">查看全部</a>
-    </header>
-
-    <section class="card">
-      <h2>按年份</h2>
-      <div class="quick">
-        {pills_html}
-      </div>
-    </section>
-
-{chr(10).join(sections)}
-
-    <footer class="footer">
-      <p>© <span id="year"></span> xugaochen</p>
-    </footer>
-
-  </main>
-
-  <script>
-    document.getElementById("year").textContent = new Date().getFullYear();
-  </script>
-</body>
-</html>
-"""
+        years[y].sort(key=BY_DT, reverse=True)
+
+    return render_page(
+        {
+            "title": "按年份",
+            "topbar": '<a href="./all.html">查看全部</a>',
+            "intro": ARCHIVE_INTRO,
+            "pills": "\n        ".join(f'<a class="pill" href="#y{y}">{y}</a>' for y in year_list),
+        },
+        [(f"y{y}", str(y), years[y]) for y in year_list],
+    )
 
 
-def patch_index_recent(index_html: str, recent_posts: list[dict]) -> str:
-    if AUTOGEN_START not in index_html or AUTOGEN_END not in index_html:
+def patch_index_recent(index_html: str, recent_posts: list[Post]) -> str:
+    start = index_html.find(AUTOGEN_START)
+    end = index_html.find(AUTOGEN_END, start + len(AUTOGEN_START)) if start != -1 else -1
+    if end == -1:
         raise RuntimeError(
             "index.html 里找不到自动生成标记。\n"
             f"请在最近更新的<ul>里加入：\n{AUTOGEN_START}\n{AUTOGEN_END}"
         )
 
+    # 两个标记都是固定字符串，直接按位置拼接，不用正则
     recent_block = "\n".join(li(p) for p in recent_posts)
-    replacement = f"{AUTOGEN_START}\n{recent_block}\n        {AUTOGEN_END}"
-
-    pattern = re.escape(AUTOGEN_START) + r".*?" + re.escape(AUTOGEN_END)
-    return re.sub(pattern, replacement, index_html, flags=re.S)
+    return index_html[:start] + f"{AUTOGEN_START}\n{recent_block}\n        " + index_html[end:]
 
 
 def main() -> None:
@@ -365,21 +439,31 @@ def main() -> None:
     if not NOTES_DIR.exists():
         raise SystemExit(f"找不到 notes 目录：{NOTES_DIR}")
 
-    posts: list[dict] = []
-    for fp in NOTES_DIR.glob("*.html"):
-        # notes 目录下只要是 html 就当文章；如果你有特殊文件可在这里排除
-        posts.append(parse_post(fp))
+    cache = load_cache()
+
+    # notes 目录下只要是 html 就当文章；如果你有特殊文件可在这里排除
+    files = list_notes()
+
+    # 每篇文章互相独立，多线程并发读文件；map 保持原有顺序
+    with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as ex:
+        results = list(ex.map(lambda item: parse_post_cached(item, cache), files))
+
+    posts: list[Post] = [post for post, _ in results]
+
+    # 只保留本次还存在的文章，删掉的文件不会留在缓存里
+    save_cache({item.name: entry for item, (_, entry) in zip(files, results)})
 
-    posts.sort(key=lambda x: x["dt"], reverse=True)
+    # all/archive 在各自分组内排序；首页只需要最新的 RECENT_N 篇，不必整体排序
+    recent = heapq.nlargest(RECENT_N, posts, key=BY_DT)
 
     # 生成 all.html / archive.html
-    ALL_PATH.write_text(build_all_html(posts), encoding="utf-8")
-    ARCHIVE_PATH.write_text(build_archive_html(posts), encoding="utf-8")
+    fast_write_text(ALL_PATH, build_all_html(posts))
+    fast_write_text(ARCHIVE_PATH, build_archive_html(posts))
 
     # 更新 index.html 最近更新
     index_html = safe_read_text(INDEX_PATH)
-    new_index = patch_index_recent(index_html, posts[:RECENT_N])
-    INDEX_PATH.write_text(new_index, encoding="utf-8")
+    new_index = patch_index_recent(index_html, recent)
+    fast_write_text(INDEX_PATH, new_index)
 
     print("✅ rebuild 完成：index.html(最近更新)、all.html、archive.html 已更新")
 